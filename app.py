@@ -4,6 +4,7 @@ import time
 
 # Internal
 from authentificate import check_password
+from catalog import FilterCatalog
 from utils import (display_distribution_charts, populate_default_values, project_indexes,
                    populate_terms, create_must_term, create_dataframe_from_response, flat_index_list,
                    get_prefixed_fields)
@@ -35,6 +36,17 @@ es_config = {
     'port': st.secrets['ld_rag']['ELASTIC_PORT'],
     'api_key': st.secrets['ld_rag']['ELASTIC_API']
 }
+
+
+@st.cache_resource
+def get_filter_catalog():
+    catalog = FilterCatalog(es_config)
+    catalog.start()
+    return catalog
+
+
+filter_catalog = get_filter_catalog()
+
 category_terms_one = None
 language_terms = None
 category_terms_two = None
@@ -78,8 +90,19 @@ else:
         st.write(f"We'll search in: {', '.join(selected_indexes)}")
 
 if selected_index:
-    category_values_one, category_values_two, language_values, country_values = populate_default_values(selected_index,
-                                                                                                        es_config)
+    default_values = filter_catalog.get_default_values(selected_index)
+    if default_values is None:
+        default_values = populate_default_values(selected_index, es_config)
+    category_values_one, category_values_two, language_values, country_values = default_values
+
+    catalog_summary = filter_catalog.get_summary(selected_index)
+    if catalog_summary:
+        caption = f"Indexed documents (including comments): {catalog_summary['doc_count']}. "
+        if catalog_summary['min_date'] and catalog_summary['max_date']:
+            caption += f"Dates from {catalog_summary['min_date']} to {catalog_summary['max_date']}. "
+        st.caption(caption + f"Filters last updated: {catalog_summary['refreshed_at']} (UTC)")
+    else:
+        st.caption("Filter catalog is not ready yet for this selection, loading filters directly from Elasticsearch.")
 
     with st.popover("Tap to refine filters"):
         st.markdown("Hihi 👋")
@@ -110,7 +133,9 @@ if selected_index:
     language_terms = populate_terms(language_values, 'language.keyword')
     country_terms = populate_terms(country_values, 'country.keyword')
 
-    issues_fields = get_prefixed_fields(selected_index, 'issues.', es_config)
+    issues_fields = filter_catalog.get_prefixed_fields(selected_index, 'issues.')
+    if issues_fields is None:
+        issues_fields = get_prefixed_fields(selected_index, 'issues.', es_config)
 
     with st.popover("Tap to define additional filtering by issue"):
         st.markdown("Edit at least one of the following thresholds to start filtering. "
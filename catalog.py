@@ -0,0 +1,366 @@
+# Base
+import os
+import json
+import logging
+import time
+import threading
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+
+# Internal
+from utils import project_indexes, get_base_index, get_category_fields, collect_prefixed_fields
+
+# External
+from elasticsearch import Elasticsearch
+
+logging.basicConfig(level=logging.INFO)
+
+CATALOG_SNAPSHOT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'catalog_snapshot.json')
+CATALOG_REFRESH_INTERVAL = 6 * 60 * 60  # seconds
+CATALOG_RETRY_INTERVAL = 5 * 60  # seconds
+CATALOG_MAX_WORKERS = 8
+
+FACET_FIELDS = [
+    'category.keyword',
+    'misc.category_one.keyword',
+    'misc.category_two.keyword',
+    'language.keyword',
+    'country.keyword'
+]
+
+
+def get_configured_indexes():
+    return sorted({index for indexes in project_indexes.values() for index in indexes})
+
+
+def get_configured_base_indexes():
+    return sorted({get_base_index(index) for index in get_configured_indexes()})
+
+
+def parse_timestamp(value):
+    """
+    Parses a timezone-aware ISO timestamp. Returns None for missing, malformed or naive values.
+    """
+    try:
+        timestamp = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+    if timestamp.tzinfo is None:
+        return None
+    return timestamp
+
+
+def now_timestamp():
+    return datetime.now(timezone.utc).isoformat(timespec='seconds')
+
+
+def format_epoch_millis(value):
+    return datetime.fromtimestamp(value / 1000, timezone.utc).strftime('%Y-%m-%d')
+
+
+def is_valid_index_entry(entry):
+    """
+    Checks that a catalog entry for an index has the shape written by `fetch_index_catalog`.
+    """
+    return (isinstance(entry, dict)
+            and isinstance(entry.get('facets'), dict)
+            and all(isinstance(values, list) for values in entry['facets'].values())
+            and isinstance(entry.get('doc_count'), int)
+            and all(isinstance(entry.get(key), (int, float, type(None))) for key in ('min_date', 'max_date'))
+            and parse_timestamp(entry.get('refreshed_at')) is not None)
+
+
+def is_valid_base_index_entry(entry):
+    """
+    Checks that a catalog entry for a base prefix has the shape written by `fetch_base_index_catalog`.
+    """
+    return (isinstance(entry, dict)
+            and isinstance(entry.get('issues_fields'), list)
+            and parse_timestamp(entry.get('refreshed_at')) is not None)
+
+
+def fetch_facet_values(es, index_name, field):
+    """
+    Retrieves unique values of a field, or an empty list if the field cannot be aggregated.
+    """
+    try:
+        response = es.search(index=index_name, size=0, aggs={field: {"terms": {"field": field, "size": 10000}}})
+        return [bucket['key'] for bucket in response['aggregations'][field]['buckets']]
+    except Exception as e:
+        logging.error(f"Error retrieving unique values from {field} in {index_name}: {e}")
+        return []
+
+
+def fetch_date_bounds(es, index_name):
+    """
+    Retrieves the earliest and latest 'date' values in epoch milliseconds, or (None, None) if they cannot be
+    aggregated.
+    """
+    try:
+        response = es.search(index=index_name, size=0,
+                             aggs={"min_date": {"min": {"field": "date"}}, "max_date": {"max": {"field": "date"}}})
+        aggregations = response['aggregations']
+        return aggregations['min_date'].get('value'), aggregations['max_date'].get('value')
+    except Exception as e:
+        logging.error(f"Error retrieving date bounds from {index_name}: {e}")
+        return None, None
+
+
+def fetch_index_catalog(es, index_name):
+    """
+    Fetches facet values, document count and date bounds for a single Elasticsearch index.
+    A failing count means the index itself is unavailable and raises; a failing field only empties that field.
+    """
+    doc_count = es.count(index=index_name)['count']
+    min_date, max_date = fetch_date_bounds(es, index_name)
+
+    return {
+        'facets': {field: fetch_facet_values(es, index_name, field) for field in FACET_FIELDS},
+        'doc_count': doc_count,
+        'min_date': min_date,
+        'max_date': max_date,
+        'refreshed_at': now_timestamp()
+    }
+
+
+def fetch_base_index_catalog(es, base_index):
+    """
+    Fetches "issues" fields of all indexes sharing the base prefix, same as `get_prefixed_fields`.
+    """
+    return {
+        'issues_fields': collect_prefixed_fields(es, base_index, 'issues.'),
+        'refreshed_at': now_timestamp()
+    }
+
+
+class FilterCatalog:
+    """
+    Keeps filter values for every index in `project_indexes` in memory and in a local snapshot file.
+    A background thread refreshes the catalog on a schedule, so the UI never queries Elasticsearch for filters.
+    """
+
+    def __init__(self, es_config, snapshot_path=CATALOG_SNAPSHOT_PATH, refresh_interval=CATALOG_REFRESH_INTERVAL,
+                 retry_interval=CATALOG_RETRY_INTERVAL):
+        self.es_config = es_config
+        self.snapshot_path = snapshot_path
+        self.refresh_interval = refresh_interval
+        self.retry_interval = retry_interval
+        self.indexes = {}
+        self.base_indexes = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.load_snapshot()
+
+    def load_snapshot(self):
+        """
+        Loads the catalog from the snapshot file, if one exists. Malformed entries are dropped and refetched.
+        """
+        if not os.path.exists(self.snapshot_path):
+            return
+        try:
+            with open(self.snapshot_path, encoding='utf-8') as f:
+                snapshot = json.load(f)
+            indexes = snapshot.get('indexes', {})
+            base_indexes = snapshot.get('base_indexes', {})
+            if not isinstance(indexes, dict) or not isinstance(base_indexes, dict):
+                raise ValueError("unexpected snapshot structure")
+            valid_indexes = {name: entry for name, entry in indexes.items() if is_valid_index_entry(entry)}
+            valid_base_indexes = {name: entry for name, entry in base_indexes.items()
+                                  if is_valid_base_index_entry(entry)}
+            dropped = (set(indexes) - set(valid_indexes)) | (set(base_indexes) - set(valid_base_indexes))
+            if dropped:
+                logging.warning(f"Dropping malformed catalog snapshot entries: {', '.join(sorted(dropped))}")
+            with self._lock:
+                self.indexes = valid_indexes
+                self.base_indexes = valid_base_indexes
+        except Exception as e:
+            logging.error(f"Error loading catalog snapshot from {self.snapshot_path}: {e}")
+
+    def save_snapshot(self):
+        """
+        Writes the catalog to the snapshot file, replacing the previous one atomically.
+        """
+        with self._lock:
+            snapshot = {'indexes': self.indexes, 'base_indexes': self.base_indexes}
+        tmp_path = f"{self.snapshot_path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, ensure_ascii=False)
+            os.replace(tmp_path, self.snapshot_path)
+        except Exception as e:
+            logging.error(f"Error saving catalog snapshot to {self.snapshot_path}: {e}")
+
+    def refresh(self, index_names=None, base_indexes=None):
+        """
+        Fetches the catalog in parallel for the given indexes and base prefixes (all configured ones by default).
+        Entries that fail to refresh keep their previous value, entries no longer configured are dropped.
+        Returns the lists of index names and base prefixes that failed.
+        """
+        if index_names is None:
+            index_names = get_configured_indexes()
+        if base_indexes is None:
+            base_indexes = get_configured_base_indexes()
+
+        with Elasticsearch(f'https://{self.es_config["host"]}:{self.es_config["port"]}',
+                           api_key=self.es_config["api_key"], request_timeout=600) as es:
+
+            def fetch(job):
+                kind, name = job
+                try:
+                    if kind == 'index':
+                        return kind, name, fetch_index_catalog(es, name)
+                    return kind, name, fetch_base_index_catalog(es, name)
+                except Exception as e:
+                    logging.error(f"Error refreshing catalog for {name}: {e}")
+                    return kind, name, None
+
+            jobs = [('index', name) for name in index_names] + [('base_index', name) for name in base_indexes]
+            with ThreadPoolExecutor(max_workers=CATALOG_MAX_WORKERS) as executor:
+                results = list(executor.map(fetch, jobs))
+
+        failed_indexes = [name for kind, name, entry in results if kind == 'index' and entry is None]
+        failed_base_indexes = [name for kind, name, entry in results if kind == 'base_index' and entry is None]
+
+        configured_indexes = set(get_configured_indexes())
+        configured_base_indexes = set(get_configured_base_indexes())
+        with self._lock:
+            for kind, name, entry in results:
+                if entry is not None:
+                    (self.indexes if kind == 'index' else self.base_indexes)[name] = entry
+            self.indexes = {name: entry for name, entry in self.indexes.items() if name in configured_indexes}
+            self.base_indexes = {name: entry for name, entry in self.base_indexes.items()
+                                 if name in configured_base_indexes}
+
+        self.save_snapshot()
+        logging.info(f"Catalog refreshed for {len(results) - len(failed_indexes) - len(failed_base_indexes)}"
+                     f"/{len(results)} entries")
+        return failed_indexes, failed_base_indexes
+
+    def get_startup_delay(self):
+        """
+        Returns seconds until the oldest configured entry becomes stale; 0 if any entry is missing or invalid.
+        """
+        with self._lock:
+            entries = ([self.indexes.get(name) for name in get_configured_indexes()] +
+                       [self.base_indexes.get(name) for name in get_configured_base_indexes()])
+
+        timestamps = [parse_timestamp(entry.get('refreshed_at')) if isinstance(entry, dict) else None
+                      for entry in entries]
+        if not timestamps or any(timestamp is None for timestamp in timestamps):
+            return 0
+        age = (datetime.now(timezone.utc) - min(timestamps)).total_seconds()
+        return max(0, self.refresh_interval - age)
+
+    def start(self):
+        """
+        Starts the background refresher. The first refresh runs right away unless every entry is still fresh.
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name='filter-catalog-refresher', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _run(self):
+        try:
+            delay = self.get_startup_delay()
+        except Exception as e:
+            logging.error(f"Error computing catalog refresh delay: {e}")
+            delay = 0
+
+        pending, last_full_refresh = None, None
+        while not self._stop_event.wait(delay):
+            pending, last_full_refresh, delay = self._refresh_step(pending, last_full_refresh, time.monotonic())
+
+    def _refresh_step(self, pending, last_full_refresh, now):
+        """
+        Runs one scheduled refresh and returns the new (pending, last_full_refresh, delay) state.
+
+        `pending` holds the (index names, base prefixes) that failed last time, or None when everything succeeded.
+        Pending entries are retried every `retry_interval`, but once `refresh_interval` has passed since the last
+        full refresh everything is refreshed again, so one permanently failing index cannot starve the rest.
+        """
+        full_refresh = (pending is None or last_full_refresh is None
+                        or now - last_full_refresh >= self.refresh_interval)
+        try:
+            if full_refresh:
+                last_full_refresh = now
+                failed_indexes, failed_base_indexes = self.refresh()
+            else:
+                failed_indexes, failed_base_indexes = self.refresh(*pending)
+        except Exception as e:
+            logging.error(f"Error refreshing catalog: {e}")
+            # Nothing is known to have succeeded, so the next attempt refreshes everything
+            return None, None, self.retry_interval
+
+        until_full_refresh = max(0, last_full_refresh + self.refresh_interval - now)
+        if failed_indexes or failed_base_indexes:
+            return (failed_indexes, failed_base_indexes), last_full_refresh, min(self.retry_interval,
+                                                                                until_full_refresh)
+        return None, last_full_refresh, until_full_refresh
+
+    def _get_entries(self, index_name):
+        """
+        Returns catalog entries for a comma-separated list of indexes, or None if any of them is missing.
+        """
+        with self._lock:
+            entries = [self.indexes.get(index) for index in index_name.split(',')]
+        if any(entry is None for entry in entries):
+            return None
+        return entries
+
+    def get_default_values(self, index_name):
+        """
+        Catalog counterpart of `populate_default_values`: returns the same four sorted lists with "Any" appended,
+        or None if the catalog does not cover all requested indexes yet.
+        """
+        entries = self._get_entries(index_name)
+        if entries is None:
+            return None
+
+        def collect(field):
+            values = set()
+            for entry in entries:
+                values.update(entry['facets'].get(field, []))
+            values.add("Any")
+            return sorted(values)
+
+        category_one_field, category_two_field = get_category_fields(index_name)
+        category_level_two_values = collect(category_two_field) if category_two_field else []
+
+        return (collect(category_one_field), category_level_two_values, collect('language.keyword'),
+                collect('country.keyword'))
+
+    def get_prefixed_fields(self, index_name, prefix):
+        """
+        Catalog counterpart of `get_prefixed_fields`, or None if the catalog cannot answer for this index or prefix.
+        """
+        if not prefix.startswith('issues.'):
+            return None
+        with self._lock:
+            entry = self.base_indexes.get(get_base_index(index_name))
+        if entry is None:
+            return None
+        return [field for field in entry['issues_fields'] if field.startswith(prefix)]
+
+    def get_summary(self, index_name):
+        """
+        Returns document count, date bounds and the oldest refresh time for the requested indexes,
+        or None if the catalog does not cover all of them yet.
+        """
+        entries = self._get_entries(index_name)
+        if entries is None:
+            return None
+
+        min_dates = [entry['min_date'] for entry in entries if entry['min_date'] is not None]
+        max_dates = [entry['max_date'] for entry in entries if entry['max_date'] is not None]
+        return {
+            'doc_count': sum(entry['doc_count'] for entry in entries),
+            'min_date': format_epoch_millis(min(min_dates)) if min_dates else None,
+            'max_date': format_epoch_millis(max(max_dates)) if max_dates else None,
+            'refreshed_at': min((parse_timestamp(entry['refreshed_at']) for entry in entries)).isoformat(
+                timespec='seconds')
+        }
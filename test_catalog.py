@@ -0,0 +1,241 @@
+import json
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import catalog
+from catalog import FilterCatalog
+from utils import collect_prefixed_fields
+
+
+def to_epoch_millis(value):
+    return datetime.fromisoformat(value).timestamp() * 1000
+
+
+class FakeCat:
+    def __init__(self, es):
+        self.es = es
+
+    def indices(self, index, h):
+        return "\n".join(name for name in self.es.docs if name.startswith(index.rstrip('*')))
+
+
+class FakeIndices:
+    def __init__(self, es):
+        self.es = es
+
+    def get_mapping(self, index):
+        issues = {field.split('.', 1)[1]: {"type": "float"} for field in self.es.docs[index]['issues']}
+        return {index: {'mappings': {'properties': {'text': {'type': 'text'},
+                                                    'issues': {'properties': issues}}}}}
+
+
+class FakeElasticsearch:
+    """
+    Minimal stand-in for the Elasticsearch client, serving the requests made by the catalog.
+    """
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.failing_indexes = set()
+        self.failing_fields = set()
+        self.cat = FakeCat(self)
+        self.indices = FakeIndices(self)
+        self.closed = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.closed += 1
+
+    def count(self, index):
+        if index in self.failing_indexes or index not in self.docs:
+            raise ConnectionError(f"cannot reach {index}")
+        return {'count': self.docs[index]['count']}
+
+    def search(self, index, size, aggs):
+        doc = self.docs[index]
+        if 'min_date' in aggs:
+            if 'date' in self.failing_fields:
+                raise ValueError("date is not a date field")
+            return {'aggregations': {'min_date': {'value': to_epoch_millis(doc['min_date'])},
+                                     'max_date': {'value': to_epoch_millis(doc['max_date'])}}}
+        field = next(iter(aggs))
+        if field in self.failing_fields:
+            raise ValueError(f"{field} cannot be aggregated")
+        return {'aggregations': {field: {'buckets': [{'key': key} for key in doc['facets'].get(field, [])]}}}
+
+
+def make_doc(count, languages, issues=(), min_date='2024-01-01T00:00:00+00:00', max_date='2024-02-01T00:00:00+00:00'):
+    return {'count': count, 'min_date': min_date, 'max_date': max_date, 'issues': list(issues),
+            'facets': {'language.keyword': languages, 'category.keyword': ['news']}}
+
+
+@pytest.fixture
+def fake_es(monkeypatch):
+    es = FakeElasticsearch({
+        'aa-bb-web': make_doc(10, ['en', 'uk'], ['issues.war']),
+        'aa-bb-telegram': make_doc(5, ['ru'], ['issues.economy']),
+    })
+    monkeypatch.setattr(catalog, 'project_indexes', {'aa-bb': ['aa-bb-web', 'aa-bb-telegram']})
+    monkeypatch.setattr(catalog, 'Elasticsearch', lambda *args, **kwargs: es)
+    return es
+
+
+@pytest.fixture
+def filter_catalog(tmp_path):
+    return FilterCatalog({'host': 'localhost', 'port': 9200, 'api_key': ''},
+                         snapshot_path=str(tmp_path / 'catalog_snapshot.json'))
+
+
+def test_partial_failure_keeps_previous_entries(fake_es, filter_catalog):
+    assert filter_catalog.refresh() == ([], [])
+    refreshed_at = filter_catalog.indexes['aa-bb-web']['refreshed_at']
+
+    fake_es.failing_indexes.add('aa-bb-web')
+    fake_es.docs['aa-bb-telegram']['count'] = 7
+    assert filter_catalog.refresh() == (['aa-bb-web'], [])
+
+    assert filter_catalog.indexes['aa-bb-web']['doc_count'] == 10
+    assert filter_catalog.indexes['aa-bb-telegram']['doc_count'] == 7
+    assert filter_catalog.indexes['aa-bb-web']['refreshed_at'] == refreshed_at
+    assert fake_es.closed == 2
+
+
+def test_failed_first_refresh_does_not_delay_startup(fake_es, filter_catalog):
+    fake_es.failing_indexes.add('aa-bb-web')
+    filter_catalog.refresh()
+
+    reloaded = FilterCatalog(filter_catalog.es_config, snapshot_path=filter_catalog.snapshot_path)
+    assert reloaded.get_startup_delay() == 0
+
+
+def test_startup_delay(fake_es, filter_catalog):
+    assert filter_catalog.get_startup_delay() == 0
+
+    filter_catalog.refresh()
+    assert filter_catalog.get_startup_delay() == pytest.approx(filter_catalog.refresh_interval, abs=60)
+
+    stale = (datetime.now(timezone.utc) - timedelta(seconds=filter_catalog.refresh_interval + 1)).isoformat()
+    filter_catalog.indexes['aa-bb-web']['refreshed_at'] = stale
+    assert filter_catalog.get_startup_delay() == 0
+
+    filter_catalog.indexes['aa-bb-web']['refreshed_at'] = '2024-01-01T00:00:00'
+    assert filter_catalog.get_startup_delay() == 0
+
+    filter_catalog.indexes['aa-bb-web']['refreshed_at'] = 'not a timestamp'
+    assert filter_catalog.get_startup_delay() == 0
+
+
+def test_refresh_drops_unconfigured_indexes(fake_es, filter_catalog, monkeypatch):
+    filter_catalog.refresh()
+    monkeypatch.setattr(catalog, 'project_indexes', {'aa-bb': ['aa-bb-web']})
+    filter_catalog.refresh()
+
+    assert list(filter_catalog.indexes) == ['aa-bb-web']
+
+
+def test_field_failure_keeps_other_filters(fake_es, filter_catalog):
+    fake_es.failing_fields.update({'date', 'category.keyword'})
+    filter_catalog.refresh()
+
+    entry = filter_catalog.indexes['aa-bb-web']
+    assert entry['facets']['language.keyword'] == ['en', 'uk']
+    assert entry['facets']['category.keyword'] == []
+    assert entry['min_date'] is None
+    assert entry['doc_count'] == 10
+
+
+def test_get_default_values_unions_indexes(fake_es, filter_catalog):
+    assert filter_catalog.get_default_values('aa-bb-web,aa-bb-telegram') is None
+
+    filter_catalog.refresh()
+    category_one, category_two, languages, countries = filter_catalog.get_default_values('aa-bb-web,aa-bb-telegram')
+
+    assert category_one == ['Any', 'news']
+    assert category_two == []
+    assert languages == ['Any', 'en', 'ru', 'uk']
+    assert countries == ['Any']
+
+
+def test_get_prefixed_fields_matches_direct_lookup(fake_es, filter_catalog):
+    fake_es.docs['aa-bb-youtube'] = make_doc(1, [], ['issues.health'])
+    filter_catalog.refresh()
+
+    assert (filter_catalog.get_prefixed_fields('aa-bb-web', 'issues.') ==
+            collect_prefixed_fields(fake_es, 'aa-bb-web', 'issues.') ==
+            ['issues.economy', 'issues.health', 'issues.war'])
+
+
+def test_malformed_snapshot_entries_fall_back(fake_es, filter_catalog):
+    filter_catalog.refresh()
+    with open(filter_catalog.snapshot_path, 'w', encoding='utf-8') as f:
+        json.dump({'indexes': {'aa-bb-web': {'doc_count': 3},
+                               'aa-bb-telegram': filter_catalog.indexes['aa-bb-telegram']},
+                   'base_indexes': {'aa-bb': {'refreshed_at': 'yesterday'}}}, f)
+
+    reloaded = FilterCatalog(filter_catalog.es_config, snapshot_path=filter_catalog.snapshot_path)
+
+    assert reloaded.get_default_values('aa-bb-web') is None
+    assert reloaded.get_summary('aa-bb-web') is None
+    assert reloaded.get_prefixed_fields('aa-bb-web', 'issues.') is None
+    assert reloaded.get_default_values('aa-bb-telegram') is not None
+
+
+def test_get_summary_compares_dates_across_offsets(fake_es, filter_catalog):
+    fake_es.docs['aa-bb-web'] = make_doc(10, [], min_date='2024-01-01T01:00:00+05:00',
+                                         max_date='2024-03-01T23:00:00-05:00')
+    fake_es.docs['aa-bb-telegram'] = make_doc(5, [], min_date='2023-12-31T22:00:00+00:00',
+                                              max_date='2024-03-02T03:00:00+00:00')
+    filter_catalog.refresh()
+    filter_catalog.indexes['aa-bb-web']['refreshed_at'] = '2024-05-01T12:00:00+03:00'
+    filter_catalog.indexes['aa-bb-telegram']['refreshed_at'] = '2024-05-01T10:00:00+00:00'
+
+    summary = filter_catalog.get_summary('aa-bb-web,aa-bb-telegram')
+
+    assert summary == {'doc_count': 15, 'min_date': '2023-12-31', 'max_date': '2024-03-02',
+                       'refreshed_at': '2024-05-01T12:00:00+03:00'}
+
+
+def test_failing_index_does_not_starve_full_refresh(fake_es, tmp_path, monkeypatch):
+    monkeypatch.setattr(catalog, 'project_indexes', {'aa-bb': ['aa-bb-web', 'aa-bb-missing']})
+    filter_catalog = FilterCatalog({'host': 'localhost', 'port': 9200, 'api_key': ''},
+                                   snapshot_path=str(tmp_path / 'catalog_snapshot.json'),
+                                   refresh_interval=100, retry_interval=10)
+
+    pending, last_full_refresh, delay = filter_catalog._refresh_step(None, None, now=0)
+    assert pending == (['aa-bb-missing'], [])
+    assert (last_full_refresh, delay) == (0, 10)
+
+    fake_es.docs['aa-bb-web']['count'] = 11
+    pending, last_full_refresh, delay = filter_catalog._refresh_step(pending, last_full_refresh, now=10)
+    assert filter_catalog.indexes['aa-bb-web']['doc_count'] == 10
+    assert (last_full_refresh, delay) == (0, 10)
+
+    pending, last_full_refresh, delay = filter_catalog._refresh_step(pending, last_full_refresh, now=95)
+    assert delay == 5
+
+    pending, last_full_refresh, delay = filter_catalog._refresh_step(pending, last_full_refresh, now=100)
+    assert filter_catalog.indexes['aa-bb-web']['doc_count'] == 11
+    assert pending == (['aa-bb-missing'], [])
+    assert (last_full_refresh, delay) == (100, 10)
+
+
+def test_run_refreshes_everything_on_schedule(fake_es, tmp_path, monkeypatch):
+    monkeypatch.setattr(catalog, 'project_indexes', {'aa-bb': ['aa-bb-web', 'aa-bb-missing']})
+    filter_catalog = FilterCatalog({'host': 'localhost', 'port': 9200, 'api_key': ''},
+                                   snapshot_path=str(tmp_path / 'catalog_snapshot.json'),
+                                   refresh_interval=0.2, retry_interval=0.05)
+    refreshed = []
+    refresh = filter_catalog.refresh
+    monkeypatch.setattr(filter_catalog, 'refresh',
+                        lambda *args: refreshed.append(args) or refresh(*args))
+
+    filter_catalog.start()
+    time.sleep(0.5)
+    filter_catalog.stop()
+
+    assert refreshed.count(()) >= 2
+    assert ((['aa-bb-missing'], []) in refreshed)
@@ -36,23 +36,32 @@ def get_unique_category_values(index_name, field, es_config):
         return []
 
 
+def get_category_fields(index_name):
+    """
+    Returns the first and second level category fields used by the specified Elasticsearch index.
+    The second level field is None for indexes that have only one category level.
+    """
+    if "dem-arm" in index_name:
+        return 'misc.category_one.keyword', 'misc.category_two.keyword'
+    elif "ru-balkans" in index_name:
+        return 'misc.category_one.keyword', None
+    else:
+        return 'category.keyword', None
+
+
 def populate_default_values(index_name, es_config):
     """
     Retrieves unique values for specified fields from an Elasticsearch index
     and appends an "Any" option to each list from the specified Elasticsearch index.
     """
-    if "dem-arm" in index_name:
-        category_level_one_values = get_unique_category_values(index_name, 'misc.category_one.keyword', es_config)
-        category_level_two_values = get_unique_category_values(index_name, 'misc.category_two.keyword', es_config)
-        category_level_one_values.append("Any")
+    category_one_field, category_two_field = get_category_fields(index_name)
+
+    category_level_one_values = get_unique_category_values(index_name, category_one_field, es_config)
+    category_level_one_values.append("Any")
+    if category_two_field:
+        category_level_two_values = get_unique_category_values(index_name, category_two_field, es_config)
         category_level_two_values.append("Any")
-    elif "ru-balkans" in index_name:
-        category_level_one_values = get_unique_category_values(index_name, 'misc.category_one.keyword', es_config)
-        category_level_one_values.append("Any")
-        category_level_two_values = []
     else:
-        category_level_one_values = get_unique_category_values(index_name, 'category.keyword', es_config)
-        category_level_one_values.append("Any")
         category_level_two_values = []
 
     language_values = get_unique_category_values(index_name, 'language.keyword', es_config)
@@ -146,10 +155,18 @@ project_indexes = {
 flat_index_list = [index for indexes in project_indexes.values() for index in indexes]
 
 
-def get_prefixed_fields(index_, prefix, es_config):
-    es = Elasticsearch(f'https://{es_config["host"]}:{es_config["port"]}', api_key=es_config["api_key"],
-                       request_timeout=600)
-    base_index = '-'.join(index_.split('-')[:2])
+def get_base_index(index_):
+    """
+    Returns the project prefix of an index name, e.g. 'ua-by' for 'ua-by-facebook'.
+    """
+    return '-'.join(index_.split('-')[:2])
+
+
+def collect_prefixed_fields(es, index_, prefix):
+    """
+    Collects fields starting with the prefix from all indexes that share the base prefix of the specified index.
+    """
+    base_index = get_base_index(index_)
     indices = es.cat.indices(index=f"{base_index}*", h="index").split()
 
     all_fields = set()
@@ -160,7 +177,13 @@ def get_prefixed_fields(index_, prefix, es_config):
         prefixed_fields = [field for field in fields if field.startswith(prefix)]
         all_fields.update(prefixed_fields)
 
-    return list(all_fields)
+    return sorted(all_fields)
+
+
+def get_prefixed_fields(index_, prefix, es_config):
+    es = Elasticsearch(f'https://{es_config["host"]}:{es_config["port"]}', api_key=es_config["api_key"],
+                       request_timeout=600)
+    return collect_prefixed_fields(es, index_, prefix)
 
 
 def add_issues_conditions(must_list, thresholds_dict):